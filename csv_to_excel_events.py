@@ -9,13 +9,16 @@ import sys
 import argparse
 import base64
 import binascii
+import importlib.util
+import json
 import math
 import numbers
 import sqlite3
 import struct
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Dict, FrozenSet, Iterable, List, NamedTuple, Optional, Tuple
 from pathlib import Path
 
+import numpy as np
 import pandas as pd
 
 SCRIPT_DIR = os.path.abspath(os.path.dirname(__file__))
@@ -26,6 +29,7 @@ DEFAULT_CSV_PATH = os.path.join(SCRIPT_DIR, "input_table.csv")
 ALLOW_EVENTCODES = {81, 82, 83, 84, 85}
 CAMERA_SEARCH_RADIUS_M = 1000.0 # 1 km
 HEADING_TOLERANCE_DEG = 20.0   # 20 degrees
+EARTH_RADIUS_M = 6371000.0
 ALLOWED_CAMERA_CODES = {
     "1-130", "1-0", "1-12", "1-13", "1-2", "1-9", "1-139",
     "7-130", "7-0", "7-9", "7-139", "48-0"
@@ -91,18 +95,7 @@ def haversine_m(lon1: float, lat1: float, lon2: float, lat2: float) -> float:
     dlon = rad(lon2 - lon1)
     dlat = rad(lat2 - lat1)
     a = math.sin(dlat / 2.0) ** 2 + math.cos(rad(lat1)) * math.cos(rad(lat2)) * math.sin(dlon / 2.0) ** 2
-    return 2.0 * 6371000.0 * math.asin(math.sqrt(a))
-
-
-def _bearing_deg(lon1: float, lat1: float, lon2: float, lat2: float) -> float:
-    phi1 = math.radians(lat1)
-    phi2 = math.radians(lat2)
-    dlon = math.radians(lon2 - lon1)
-    y = math.sin(dlon) * math.cos(phi2)
-    x = math.cos(phi1) * math.sin(phi2) - math.sin(phi1) * math.cos(phi2) * math.cos(dlon)
-    theta = math.atan2(y, x)
-    bearing = (math.degrees(theta) + 360.0) % 360.0
-    return bearing
+    return 2.0 * EARTH_RADIUS_M * math.asin(math.sqrt(a))
 
 
 def _angle_diff_deg(a: float, b: float) -> float:
@@ -112,16 +105,133 @@ def _angle_diff_deg(a: float, b: float) -> float:
     return diff
 
 
-def _degree_buffer(lat: float) -> Tuple[float, float]:
-    lat_buffer = CAMERA_SEARCH_RADIUS_M / 111320.0
+def _degree_buffer(lat: float, radius_m: Optional[float] = None) -> Tuple[float, float]:
+    if radius_m is None:
+        radius_m = CAMERA_SEARCH_RADIUS_M
+    lat_buffer = radius_m / 111320.0
     cos_lat = math.cos(math.radians(lat))
     if abs(cos_lat) < 1e-12:
         lon_buffer = 180.0
     else:
-        lon_buffer = CAMERA_SEARCH_RADIUS_M / (111320.0 * abs(cos_lat))
+        lon_buffer = radius_m / (111320.0 * abs(cos_lat))
     return lat_buffer, lon_buffer
 
 
+class MatchingProfile(NamedTuple):
+    name: str
+    search_radius_m: float
+    heading_tolerance_deg: float
+    camera_codes: FrozenSet[str]
+    event_codes: FrozenSet[int]
+
+
+def default_matching_profile(name: str = "default") -> MatchingProfile:
+    return MatchingProfile(
+        name=name,
+        search_radius_m=CAMERA_SEARCH_RADIUS_M,
+        heading_tolerance_deg=HEADING_TOLERANCE_DEG,
+        camera_codes=frozenset(ALLOWED_CAMERA_CODES),
+        event_codes=frozenset(ALLOW_EVENTCODES),
+    )
+
+
+PROFILE_CODE_SEPARATOR = "|"
+
+
+def _profile_code_items(value: Any, profile_name: str, key: str) -> List[Any]:
+    # "," already separates --profile options, so code lists given as text
+    # use PROFILE_CODE_SEPARATOR, e.g. event_codes=81|82.
+    if isinstance(value, str):
+        items: List[Any] = value.split(PROFILE_CODE_SEPARATOR)
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        items = list(value)
+    else:
+        raise ValueError(f"Matching profile '{profile_name}' needs {key} as a list or '|'-separated text.")
+    items = [item.strip() if isinstance(item, str) else item for item in items]
+    items = [item for item in items if item != "" and item is not None]
+    if not items:
+        raise ValueError(f"Matching profile '{profile_name}' has an empty {key} set.")
+    return items
+
+
+def _profile_event_code(item: Any, profile_name: str) -> int:
+    if isinstance(item, numbers.Integral) and not isinstance(item, bool):
+        return int(item)
+    try:
+        return int(str(item))
+    except ValueError:
+        raise ValueError(f"Matching profile '{profile_name}' has a non-integer event code: {item!r}")
+
+
+def _profile_from_mapping(entry: Dict[str, Any], fallback_name: str) -> MatchingProfile:
+    base = default_matching_profile(str(entry.get("name") or fallback_name))
+    unknown = set(entry) - {"name", "radius", "heading", "camera_codes", "event_codes"}
+    if unknown:
+        raise ValueError(f"Unknown matching profile keys in '{base.name}': {sorted(unknown)}")
+    try:
+        radius = float(entry.get("radius", base.search_radius_m))
+        heading = float(entry.get("heading", base.heading_tolerance_deg))
+    except (TypeError, ValueError):
+        raise ValueError(f"Matching profile '{base.name}' has a non-numeric radius or heading.")
+    if not radius > 0 or math.isinf(radius):
+        raise ValueError(f"Matching profile '{base.name}' needs a positive radius.")
+    if not 0.0 <= heading <= 180.0:
+        raise ValueError(f"Matching profile '{base.name}' needs a heading tolerance between 0 and 180 degrees.")
+    camera_codes = base.camera_codes
+    if "camera_codes" in entry:
+        camera_codes = frozenset(
+            str(code).strip().upper() for code in _profile_code_items(entry["camera_codes"], base.name, "camera_codes")
+        )
+    event_codes = base.event_codes
+    if "event_codes" in entry:
+        event_codes = frozenset(
+            _profile_event_code(code, base.name)
+            for code in _profile_code_items(entry["event_codes"], base.name, "event_codes")
+        )
+    return base._replace(
+        search_radius_m=radius,
+        heading_tolerance_deg=heading,
+        camera_codes=camera_codes,
+        event_codes=event_codes,
+    )
+
+
+def parse_profile_spec(spec: str) -> MatchingProfile:
+    """Parse ``name:radius=500,heading=15,event_codes=81|82`` into a profile based on the defaults."""
+    name, _, options = spec.partition(":")
+    name = name.strip()
+    if not name:
+        raise ValueError(f"Matching profile needs a name: {spec!r}")
+    entry: Dict[str, Any] = {"name": name}
+    for option in options.split(","):
+        option = option.strip()
+        if not option:
+            continue
+        key, sep, value = option.partition("=")
+        if not sep:
+            raise ValueError(f"Invalid matching profile option {option!r} in {spec!r}")
+        entry[key.strip()] = value.strip()
+    return _profile_from_mapping(entry, name)
+
+
+def load_matching_profiles(path: str) -> List[MatchingProfile]:
+    with open(path, encoding="utf-8") as fh:
+        data = json.load(fh)
+    if isinstance(data, dict):
+        data = data.get("profiles", [])
+    if not isinstance(data, list) or not data:
+        raise ValueError(f"No matching profiles found in {path}")
+    return [_profile_from_mapping(entry, f"profile{pos + 1}") for pos, entry in enumerate(data)]
+
+
+def _check_profile_names(profiles: List[MatchingProfile]) -> None:
+    seen = set()
+    for profile in profiles:
+        if profile.name in seen:
+            raise ValueError(f"Duplicate matching profile name: {profile.name}")
+        seen.add(profile.name)
+
+
 def decode_spatialite_point(blob_value: Any) -> Optional[Tuple[float, float]]:
     if blob_value is None:
         return None
@@ -148,40 +258,132 @@ def decode_spatialite_point(blob_value: Any) -> Optional[Tuple[float, float]]:
     return lon, lat
 
 
+def _unit_vector(lon: float, lat: float) -> Tuple[float, float, float]:
+    phi = math.radians(lat)
+    lam = math.radians(lon)
+    cos_phi = math.cos(phi)
+    return cos_phi * math.cos(lam), cos_phi * math.sin(lam), math.sin(phi)
+
+
+def _chord_sq_threshold(radius_m: float) -> float:
+    # Squared straight-line distance between unit vectors separated by radius_m
+    # along the sphere; monotonic in great-circle distance.
+    half_angle = min(radius_m / (2.0 * EARTH_RADIUS_M), math.pi / 2.0)
+    chord = 2.0 * math.sin(half_angle)
+    return chord * chord
+
+
 class CameraIndex:
-    def __init__(self, records: List[Dict[str, Any]]):
+    def __init__(
+        self,
+        records: List[Dict[str, Any]],
+        search_radius_m: Optional[float] = None,
+        heading_tolerance_deg: Optional[float] = None,
+    ):
         self._records = records
-
-    def lookup(self, lon: float, lat: float, heading: Optional[float], *, require_heading: bool = True) -> Optional[Dict[str, Any]]:
-        if not self._records:
-            return None
-        lat_buf, lon_buf = _degree_buffer(lat)
-        best: Optional[Dict[str, Any]] = None
-        best_dist = CAMERA_SEARCH_RADIUS_M + 1.0
-        for record in self._records:
+        self.search_radius_m = CAMERA_SEARCH_RADIUS_M if search_radius_m is None else search_radius_m
+        self.heading_tolerance_deg = HEADING_TOLERANCE_DEG if heading_tolerance_deg is None else heading_tolerance_deg
+        # (lat, lon, x, y, z) per record, aligned with self._records.
+        self._geometry: List[Tuple[float, float, float, float, float]] = []
+        # Square lat/lon grid whose cell edge equals the search radius in
+        # latitude degrees, so a lookup touches only a handful of cells.
+        self._cell_deg = max(self.search_radius_m / 111320.0, 1e-9)
+        self._cells: Dict[Tuple[int, int], List[int]] = {}
+        for i, record in enumerate(records):
             cam_lat = record["latitude"]
             cam_lon = record["longitude"]
+            x, y, z = _unit_vector(cam_lon, cam_lat)
+            self._geometry.append((cam_lat, cam_lon, x, y, z))
+            self._cells.setdefault(self._cell_key(cam_lon, cam_lat), []).append(i)
+        self._chord_sq_max = _chord_sq_threshold(self.search_radius_m)
+
+    def _cell_key(self, lon: float, lat: float) -> Tuple[int, int]:
+        return math.floor(lat / self._cell_deg), math.floor(lon / self._cell_deg)
+
+    def _candidates(self, lon: float, lat: float, lat_buf: float, lon_buf: float) -> Iterable[int]:
+        lat_lo, lon_lo = self._cell_key(lon - lon_buf, lat - lat_buf)
+        lat_hi, lon_hi = self._cell_key(lon + lon_buf, lat + lat_buf)
+        if (lat_hi - lat_lo + 1) * (lon_hi - lon_lo + 1) > len(self._cells):
+            return range(len(self._records))
+        found: List[int] = []
+        for lat_key in range(lat_lo, lat_hi + 1):
+            for lon_key in range(lon_lo, lon_hi + 1):
+                bucket = self._cells.get((lat_key, lon_key))
+                if bucket:
+                    found.extend(bucket)
+        # Record order decides ties, as in a full scan.
+        found.sort()
+        return found
+
+    def lookup(
+        self,
+        lon: float,
+        lat: float,
+        heading: Optional[float],
+        *,
+        require_heading: bool = True,
+        stats: Optional[Dict[str, int]] = None,
+    ) -> Optional[Dict[str, Any]]:
+        if not self._records:
+            return None
+        if require_heading and heading is None:
+            return None
+        lat_buf, lon_buf = _degree_buffer(lat, self.search_radius_m)
+        tolerance = self.heading_tolerance_deg
+
+        phi = math.radians(lat)
+        lam = math.radians(lon)
+        sin_phi, cos_phi = math.sin(phi), math.cos(phi)
+        sin_lam, cos_lam = math.sin(lam), math.cos(lam)
+        qx, qy, qz = cos_phi * cos_lam, cos_phi * sin_lam, sin_phi
+        # Local east/north axes at the query point. The camera's unit vector
+        # projected on them gives the east and north components of the
+        # direction to the camera, so atan2(east, north) is the initial
+        # great-circle bearing from the query point, clockwise from north.
+        ex, ey = -sin_lam, cos_lam
+        nx, ny, nz = -sin_phi * cos_lam, -sin_phi * sin_lam, cos_phi
+
+        chord_sq_max = self._chord_sq_max
+        best_i = -1
+        best_chord_sq = chord_sq_max
+        in_radius = 0
+        heading_rejected = 0
+        azimuth_rejected = 0
+        geometry = self._geometry
+        for i in self._candidates(lon, lat, lat_buf, lon_buf):
+            cam_lat, cam_lon, x, y, z = geometry[i]
             if abs(cam_lat - lat) > lat_buf or abs(cam_lon - lon) > lon_buf:
                 continue
-            distance = haversine_m(lon, lat, cam_lon, cam_lat)
-            if distance > CAMERA_SEARCH_RADIUS_M:
+            dx = x - qx
+            dy = y - qy
+            dz = z - qz
+            chord_sq = dx * dx + dy * dy + dz * dz
+            if chord_sq > chord_sq_max:
                 continue
+            in_radius += 1
 
             if require_heading:
-                if heading is None:
-                    continue
-                cam_heading = record.get("heading")
-                if cam_heading is None or _angle_diff_deg(cam_heading, heading) > HEADING_TOLERANCE_DEG:
+                cam_heading = self._records[i].get("heading")
+                if cam_heading is None or _angle_diff_deg(cam_heading, heading) > tolerance:
+                    heading_rejected += 1
                     continue
-                azimuth = _bearing_deg(lon, lat, cam_lon, cam_lat)
-                if _angle_diff_deg(azimuth, heading) > HEADING_TOLERANCE_DEG:
+                azimuth = (math.degrees(math.atan2(x * ex + y * ey, x * nx + y * ny + z * nz)) + 360.0) % 360.0
+                if _angle_diff_deg(azimuth, heading) > tolerance:
+                    azimuth_rejected += 1
                     continue
 
-            if distance < best_dist:
-                best = record
-                best_dist = distance
-        if best is None:
+            if best_i < 0 or chord_sq < best_chord_sq:
+                best_i = i
+                best_chord_sq = chord_sq
+        if stats is not None:
+            stats["in_radius"] = in_radius
+            if require_heading:
+                stats["heading_rejected"] = heading_rejected
+                stats["azimuth_rejected"] = azimuth_rejected
+        if best_i < 0:
             return None
+        best = self._records[best_i]
+        best_dist = haversine_m(lon, lat, best["longitude"], best["latitude"])
         return {
             "row_idx": best.get("row_idx"),
             "cam_id": best.get("cam_id"),
@@ -247,25 +449,32 @@ def _table_has_column(conn: sqlite3.Connection, table: str, column: str) -> bool
     return any(row[1] == column for row in cur.fetchall())
 
 
-def load_camera_records_from_sqlite(db_path: str, table: str, spatialite_extension: Optional[str]) -> List[Dict[str, Any]]:
+def load_camera_records_from_sqlite(
+    db_path: str,
+    table: str,
+    spatialite_extension: Optional[str],
+    allowed_codes: Optional[Iterable[str]] = None,
+) -> List[Dict[str, Any]]:
+    allowed = set(ALLOWED_CAMERA_CODES if allowed_codes is None else allowed_codes)
     conn = connect_spatialite(db_path, spatialite_extension)
     try:
         has_type = _table_has_column(conn, table, "type")
-        placeholders = ", ".join(f'"{code}"' for code in sorted(ALLOWED_CAMERA_CODES))
+        codes = sorted(allowed)
+        placeholders = ", ".join("?" for _ in codes)
         select_cols = 'idx, cam_id, speed, heading, code, ST_X(GEOMETRY), ST_Y(GEOMETRY)'
         if has_type:
             select_cols += ', type'
         query = (
             f'SELECT {select_cols} '
             f'FROM "{table}" '
-            'WHERE cam_id IS NOT NULL AND TRIM(cam_id) <> "" '
+            "WHERE cam_id IS NOT NULL AND TRIM(cam_id) <> '' "
         )
         if has_type:
-            query += 'AND type = "EP" '
+            query += "AND type = 'EP' "
         query += f'AND code IN ({placeholders})'
 
         records: List[Dict[str, Any]] = []
-        for row in conn.execute(query):
+        for row in conn.execute(query, codes):
             if has_type:
                 idx_value, cam_id, speed, heading, code, lon, lat, cam_type = row
                 cam_type_text = str(cam_type).upper() if cam_type else ""
@@ -287,7 +496,7 @@ def load_camera_records_from_sqlite(db_path: str, table: str, spatialite_extensi
                 continue
 
             code_text = str(code).strip().upper()
-            if code_text not in ALLOWED_CAMERA_CODES:
+            if code_text not in allowed:
                 continue
 
             row_idx_val: Optional[int] = None
@@ -328,7 +537,8 @@ def read_camera_csv(csv_path: str) -> pd.DataFrame:
     raise RuntimeError(f"Failed to read camera CSV: {last_err}")
 
 
-def load_camera_records_from_csv(csv_path: str) -> List[Dict[str, Any]]:
+def load_camera_records_from_csv(csv_path: str, allowed_codes: Optional[Iterable[str]] = None) -> List[Dict[str, Any]]:
+    allowed = set(ALLOWED_CAMERA_CODES if allowed_codes is None else allowed_codes)
     df = read_camera_csv(csv_path)
 
     def _normalize(name: Any) -> str:
@@ -392,7 +602,7 @@ def load_camera_records_from_csv(csv_path: str) -> List[Dict[str, Any]]:
         if pd.isna(code_value):
             continue
         code_text = str(code_value).strip().upper()
-        if code_text not in ALLOWED_CAMERA_CODES:
+        if code_text not in allowed:
             continue
 
         lon_lat: Optional[Tuple[float, float]] = None
@@ -484,29 +694,155 @@ def resolve_camera_source(
     return cam_db, cam_csv, message
 
 
-def build_camera_index(
+def load_camera_store(
     cam_db: Optional[str],
     cam_csv: Optional[str],
     cam_table: str,
     spatialite_extension: Optional[str],
-) -> Tuple[Optional[CameraIndex], Optional[str]]:
+    allowed_codes: Optional[Iterable[str]] = None,
+) -> Tuple[Optional[List[Dict[str, Any]]], Optional[str]]:
     cam_db, cam_csv, auto_message = resolve_camera_source(cam_db, cam_csv)
 
     if cam_db:
         if not os.path.exists(cam_db):
             raise FileNotFoundError(f"Camera DB not found: {cam_db}")
-        records = load_camera_records_from_sqlite(cam_db, cam_table, spatialite_extension)
+        records = load_camera_records_from_sqlite(cam_db, cam_table, spatialite_extension, allowed_codes)
     elif cam_csv:
         if not os.path.exists(cam_csv):
             raise FileNotFoundError(f"Camera CSV not found: {cam_csv}")
-        records = load_camera_records_from_csv(cam_csv)
+        records = load_camera_records_from_csv(cam_csv, allowed_codes)
     else:
         return None, auto_message
+    return records, auto_message
+
 
-    normalized = _deduplicate_camera_records(records)
+def build_profile_index(records: Optional[List[Dict[str, Any]]], profile: MatchingProfile) -> Optional[CameraIndex]:
+    if records is None:
+        return None
+    selected = [record for record in records if record["code"] in profile.camera_codes]
+    normalized = _deduplicate_camera_records(selected)
     if not normalized:
-        raise RuntimeError("Camera data could not be prepared.")
-    return CameraIndex(normalized), auto_message
+        raise RuntimeError(f"Camera data could not be prepared for profile '{profile.name}'.")
+    return CameraIndex(normalized, profile.search_radius_m, profile.heading_tolerance_deg)
+
+
+def build_profile_indexes(
+    cam_db: Optional[str],
+    cam_csv: Optional[str],
+    cam_table: str,
+    spatialite_extension: Optional[str],
+    profiles: List[MatchingProfile],
+) -> Tuple[List[Tuple[MatchingProfile, Optional[CameraIndex]]], Optional[str]]:
+    _check_profile_names(profiles)
+    all_codes = set()
+    for profile in profiles:
+        all_codes.update(profile.camera_codes)
+    records, auto_message = load_camera_store(cam_db, cam_csv, cam_table, spatialite_extension, all_codes)
+    return [(profile, build_profile_index(records, profile)) for profile in profiles], auto_message
+
+
+def build_camera_index(
+    cam_db: Optional[str],
+    cam_csv: Optional[str],
+    cam_table: str,
+    spatialite_extension: Optional[str],
+) -> Tuple[Optional[CameraIndex], Optional[str]]:
+    indexes, auto_message = build_profile_indexes(
+        cam_db, cam_csv, cam_table, spatialite_extension, [default_matching_profile()]
+    )
+    return indexes[0][1], auto_message
+
+
+DIAGNOSTIC_COLUMNS = [
+    "_source_file", "Num_event", "profile", "sample_count", "matched_sample", "input_csv",
+    "source_row", "match_mode", "camera_id", "distance_m", "candidates",
+    "heading_rejected", "azimuth_rejected", "invalid_gps", "reason",
+]
+SAMPLE_LABELS = ("t0", "t+5s", "t+10s")
+
+
+MATCH_MODES = ("", "strict", "relaxed")
+REASON_NO_CAMERA_INDEX = 1
+REASON_INVALID_GPS = 2
+REASON_NO_HEADING = 4
+REASON_NO_CAMERA_IN_RADIUS = 8
+REASON_HEADING_MISMATCH = 16
+REASON_AZIMUTH_MISMATCH = 32
+REASON_FLAGS = (
+    ("no_camera_index", REASON_NO_CAMERA_INDEX),
+    ("invalid_gps", REASON_INVALID_GPS),
+    ("no_heading", REASON_NO_HEADING),
+    ("no_camera_in_radius", REASON_NO_CAMERA_IN_RADIUS),
+    ("heading_mismatch", REASON_HEADING_MISMATCH),
+    ("azimuth_mismatch", REASON_AZIMUTH_MISMATCH),
+)
+
+
+class MatchDiagnostics:
+    """Per-event camera matching provenance, one frame per aggregate() profile pass."""
+
+    def __init__(self, input_csv: Optional[str] = None) -> None:
+        # Reported as input_csv when the aggregated frame has no _input_csv column.
+        self.input_csv = input_csv
+        self._frames: List[pd.DataFrame] = []
+
+    def __len__(self) -> int:
+        return sum(len(frame) for frame in self._frames)
+
+    def add_frame(self, frame: pd.DataFrame) -> None:
+        self._frames.append(frame)
+
+    def to_frame(self) -> pd.DataFrame:
+        if not self._frames:
+            return pd.DataFrame(columns=DIAGNOSTIC_COLUMNS)
+        return pd.concat(self._frames, ignore_index=True)[DIAGNOSTIC_COLUMNS]
+
+
+def _diagnostic_reason(has_index: bool, result: Dict[str, Any]) -> int:
+    """Return REASON_FLAGS bits for why the event did not get a strict match.
+
+    Counts come from the attempt that matched, or the last attempt if none did.
+    """
+    if not has_index:
+        return REASON_NO_CAMERA_INDEX
+    if result["mode"] == "strict":
+        return 0
+    flags = 0
+    stats = result["stats"]
+    if result["match"] is None and result["invalid_gps"]:
+        flags |= REASON_INVALID_GPS
+    if result["attempts"]:
+        if result["missing_heading"]:
+            flags |= REASON_NO_HEADING
+        if stats["in_radius"] == 0:
+            flags |= REASON_NO_CAMERA_IN_RADIUS
+        if stats["heading_rejected"]:
+            flags |= REASON_HEADING_MISMATCH
+        if stats["azimuth_rejected"]:
+            flags |= REASON_AZIMUTH_MISMATCH
+    return flags
+
+
+def _reason_labels(flags: np.ndarray) -> np.ndarray:
+    values, inverse = np.unique(flags, return_inverse=True)
+    labels = np.array(
+        [";".join(name for name, bit in REASON_FLAGS if value & bit) for value in values],
+        dtype=object,
+    )
+    return labels[inverse]
+
+
+def _has_parquet_engine() -> bool:
+    return any(importlib.util.find_spec(name) is not None for name in ("pyarrow", "fastparquet"))
+
+
+def write_diagnostics(diagnostics: MatchDiagnostics, path: str) -> str:
+    frame = diagnostics.to_frame()
+    if path.lower().endswith(".parquet"):
+        frame.to_parquet(path, index=False)
+    else:
+        frame.to_csv(path, index=False, encoding="utf-8-sig")
+    return path
 
 
 def classify_speed(
@@ -581,120 +917,348 @@ def month_from_digits(s: str):
     return None
 
 
-def aggregate(df: pd.DataFrame, camera_index: Optional[CameraIndex]) -> pd.DataFrame:
-    df_f = df[df["eventcode_int"].isin(list(ALLOW_EVENTCODES))].copy()
+def _match_event(
+    samples: List[Tuple[Any, Any, Any]],
+    camera_index: Optional[CameraIndex],
+    collect_stats: bool = False,
+) -> Dict[str, Any]:
+    # "stats" and "missing_heading" describe the last attempt (the matching
+    # one, if any); "invalid_gps" counts every skipped sample.
+    result: Dict[str, Any] = {
+        "match": None,
+        "pos": None,
+        "mode": "",
+        "stats": {} if collect_stats else None,
+        "invalid_gps": 0,
+        "missing_heading": False,
+        "attempts": 0,
+    }
+    if camera_index is None or not samples:
+        return result
+    lookup_order: List[int] = []
+    if len(samples) >= 2:
+        lookup_order.append(1)
+    if len(samples) >= 1:
+        lookup_order.append(0)
+    if len(samples) >= 3:
+        lookup_order.append(2)
+
+    for pos in lookup_order:
+        raw_x, raw_y, raw_degree = samples[pos]
+        lon_val = _safe_float(raw_x)
+        lat_val = _safe_float(raw_y)
+        heading_val = _safe_float(raw_degree)
+        if lon_val is None or lat_val is None:
+            result["invalid_gps"] += 1
+            continue
+        result["attempts"] += 1
+        stats: Optional[Dict[str, int]] = None
+        if collect_stats:
+            stats = {"in_radius": 0, "heading_rejected": 0, "azimuth_rejected": 0}
+        result["stats"] = stats
+        result["missing_heading"] = heading_val is None
+        match = None
+        mode = "strict"
+        if heading_val is not None:
+            match = camera_index.lookup(lon_val, lat_val, heading_val, require_heading=True, stats=stats)
+        if match is None:
+            mode = "relaxed"
+            match = camera_index.lookup(lon_val, lat_val, heading_val, require_heading=False, stats=stats)
+        if match:
+            result["match"] = match
+            result["pos"] = pos
+            result["mode"] = mode
+            break
+    return result
 
-    recs = []
-    for (src, num_event), g in df_f.groupby(["_source_file", "Num_event"], sort=False):
-        g_sorted = g.sort_values("_digits", kind="stable")
-        g3 = g_sorted.head(3)
 
-        speeds = g3["Speed_num"].tolist()
-        t0 = speeds[0] if len(speeds) >= 1 else None
-        p5 = speeds[1] if len(speeds) >= 2 else None
-        p10 = speeds[2] if len(speeds) >= 3 else None
+def _index_labels(index: pd.Index, positions: np.ndarray) -> Any:
+    """Index labels at ``positions``; -1 becomes a missing value."""
+    missing = positions < 0
+    labels = index.to_numpy()[np.where(missing, 0, positions)] if len(index) else np.zeros(len(positions), dtype=np.int64)
+    if np.issubdtype(labels.dtype, np.integer):
+        return pd.arrays.IntegerArray(labels.astype(np.int64), missing)
+    labels = labels.astype(object)
+    labels[missing] = None
+    return labels
 
-        row0 = g3.iloc[0] if len(g3) >= 1 else None
-        DateTime = row0["DateTime"] if row0 is not None else ""
-        eventcode = row0["eventcode"] if row0 is not None else ""
-        GPS_X = row0["GPS_X"] if row0 is not None else ""
-        GPS_Y = row0["GPS_Y"] if row0 is not None else ""
-        GPS_Degree = row0["GPS_Degree"] if row0 is not None else ""
-        month_val = month_from_digits(row0["_digits"]) if row0 is not None else None
 
-        camera_id_val = ""
-        row_idx_val: Optional[int] = None
-        limit_speed_val: Optional[float] = None
-        if camera_index is not None and not g3.empty:
-            lookup_order: List[pd.Series] = []
-            if len(g3) >= 2:
-                lookup_order.append(g3.iloc[1])
-            if len(g3) >= 1:
-                lookup_order.append(g3.iloc[0])
-            if len(g3) >= 3:
-                lookup_order.append(g3.iloc[2])
-
-            for lookup_row in lookup_order:
-                lon_val = _safe_float(lookup_row.get("GPS_X"))
-                lat_val = _safe_float(lookup_row.get("GPS_Y"))
-                heading_val = _safe_float(lookup_row.get("GPS_Degree"))
-                if lon_val is None or lat_val is None:
-                    continue
-                match = None
-                if heading_val is not None:
-                    match = camera_index.lookup(lon_val, lat_val, heading_val, require_heading=True)
-                if match is None:
-                    match = camera_index.lookup(lon_val, lat_val, heading_val, require_heading=False)
+def _input_csv_labels(df: pd.DataFrame, positions: np.ndarray, default: Optional[str]) -> np.ndarray:
+    """Input CSV name of the rows at ``positions``; -1 becomes None."""
+    missing = positions < 0
+    if "_input_csv" in df.columns and len(df):
+        labels = df["_input_csv"].to_numpy(dtype=object)[np.where(missing, 0, positions)]
+    else:
+        labels = np.full(len(positions), default, dtype=object)
+    labels[missing] = None
+    return labels
+
+
+def _profile_column(name: str, profile: MatchingProfile, suffixed: bool) -> str:
+    return f"{name}_{profile.name}" if suffixed else name
+
+
+def _first_rows(group_codes: np.ndarray, n_groups: int, keep: Optional[np.ndarray] = None) -> np.ndarray:
+    """Return an (n_groups, 3) array of positions of each group's first three rows.
+
+    ``group_codes`` must already be sorted; missing slots are -1.
+    """
+    positions = np.full((n_groups, 3), -1, dtype=np.intp)
+    rows = np.arange(len(group_codes)) if keep is None else np.flatnonzero(keep)
+    if not len(rows):
+        return positions
+    codes = group_codes[rows]
+    steps = np.arange(len(codes))
+    is_start = np.empty(len(codes), dtype=bool)
+    is_start[0] = True
+    is_start[1:] = codes[1:] != codes[:-1]
+    rank = steps - np.maximum.accumulate(np.where(is_start, steps, 0))
+    first3 = rank < 3
+    positions[codes[first3], rank[first3]] = rows[first3]
+    return positions
+
+
+def _profile_event_codes(profiles: List[Tuple[MatchingProfile, Optional[CameraIndex]]]) -> set:
+    event_codes = set()
+    for profile, _ in profiles:
+        event_codes.update(profile.event_codes)
+    return event_codes
+
+
+def _ordered_event_rows(df: pd.DataFrame, event_codes: Iterable[int]) -> Tuple[np.ndarray, np.ndarray, int]:
+    """Return row positions ordered by (event group, _digits), their group ids and the group count.
+
+    Group ids follow first appearance, like ``groupby(sort=False)``.
+    """
+    key_cols = ["_source_file", "Num_event"]
+    allowed = df["eventcode_int"].isin(list(event_codes)).to_numpy(dtype=bool)
+    group_ids = df.loc[allowed, key_cols].groupby(key_cols, sort=False).ngroup().to_numpy(dtype=float)
+    has_group = ~np.isnan(group_ids)
+    rows = np.flatnonzero(allowed)[has_group]
+    group_ids = group_ids[has_group].astype(np.intp)
+    n = int(group_ids.max()) + 1 if len(group_ids) else 0
+
+    order = np.argsort(df["_digits"].to_numpy()[rows], kind="stable")
+    order = order[np.argsort(group_ids[order], kind="stable")]
+    return rows[order], group_ids[order], n
+
+
+def _sample_rows(df: pd.DataFrame, profiles: List[Tuple[MatchingProfile, Optional[CameraIndex]]]) -> np.ndarray:
+    """Positions of every row ``aggregate`` can read from ``df``, in their original order.
+
+    That is each event's first three rows for the combined and per-profile
+    event codes, plus its first-appearing row so the group order is kept.
+    """
+    event_codes = _profile_event_codes(profiles)
+    rows, group_ids, n = _ordered_event_rows(df, event_codes)
+    if not n:
+        return rows
+    first_seen = np.full(n, len(df), dtype=np.intp)
+    np.minimum.at(first_seen, group_ids, rows)
+    kept = [first_seen]
+    code_values = df["eventcode_int"]
+    for codes in {frozenset(event_codes)} | {profile.event_codes for profile, _ in profiles}:
+        keep = None if codes == event_codes else code_values.isin(list(codes)).to_numpy(dtype=bool)[rows]
+        positions = _first_rows(group_ids, n, keep)
+        kept.append(rows[positions[positions >= 0]])
+    return np.unique(np.concatenate(kept))
+
+
+def _resolve_profiles(
+    camera_index: Optional[CameraIndex],
+    profiles: Optional[List[Tuple[MatchingProfile, Optional[CameraIndex]]]],
+) -> List[Tuple[MatchingProfile, Optional[CameraIndex]]]:
+    # camera_index is shorthand for the single default profile.
+    if profiles is None:
+        return [(default_matching_profile(), camera_index)]
+    if camera_index is not None:
+        raise ValueError("Pass either camera_index or profiles, not both.")
+    return profiles
+
+
+def aggregate(
+    df: pd.DataFrame,
+    camera_index: Optional[CameraIndex] = None,
+    diagnostics: Optional[MatchDiagnostics] = None,
+    *,
+    profiles: Optional[List[Tuple[MatchingProfile, Optional[CameraIndex]]]] = None,
+) -> pd.DataFrame:
+    profiles = _resolve_profiles(camera_index, profiles)
+    # With several profiles every camera-dependent column gets a _<name> suffix.
+    suffixed = len(profiles) > 1
+    event_codes = _profile_event_codes(profiles)
+
+    # Work on row positions instead of copied sub-frames: rows are ordered by
+    # (group, _digits) and every output column is taken or filled by position.
+    rows, group_ids, n = _ordered_event_rows(df, event_codes)
+
+    def _take_rows(positions: np.ndarray) -> np.ndarray:
+        return np.where(positions >= 0, rows[positions], -1)
+
+    samples_all = _take_rows(_first_rows(group_ids, n))
+    first = samples_all[:, 0]
+
+    out_cols: Dict[str, Any] = {}
+    source_files = df["_source_file"].array.take(first)
+    for col in ("Num_event", "DateTime", "eventcode", "GPS_X", "GPS_Y", "GPS_Degree"):
+        out_cols[col] = df[col].array.take(first)
+
+    speed_array = df["Speed_num"].array
+    speed_values = df["Speed_num"].to_numpy(dtype=float, na_value=np.nan)
+    gps_x = df["GPS_X"].to_numpy()
+    gps_y = df["GPS_Y"].to_numpy()
+    gps_degree = df["GPS_Degree"].to_numpy()
+    code_values = df["eventcode_int"]
+
+    def _speed(row: int) -> Optional[float]:
+        return speed_values[row] if row >= 0 else None
+
+    classification_cols: Dict[str, Any] = {}
+    for profile, profile_index in profiles:
+        if profile.event_codes == event_codes:
+            samples = samples_all
+        else:
+            keep = code_values.isin(list(profile.event_codes)).to_numpy(dtype=bool)[rows]
+            samples = _take_rows(_first_rows(group_ids, n, keep))
+
+        camera_ids = np.full(n, "", dtype=object)
+        row_idx_values = np.zeros(n, dtype=np.int64)
+        row_idx_missing = np.ones(n, dtype=bool)
+        limit_speeds = np.full(n, np.nan)
+        classes = np.zeros(n, dtype=np.int64)
+        classes_missing = np.ones(n, dtype=bool)
+        collect = diagnostics is not None
+        if collect:
+            # Plain preallocated lists: scalar stores are cheaper than on
+            # numpy arrays; each becomes an array once after the loop.
+            matched_pos = [-1] * n
+            match_modes = [0] * n
+            distances = [math.nan] * n
+            candidates = [0] * n
+            heading_rejected = [0] * n
+            azimuth_rejected = [0] * n
+            invalid_gps = [0] * n
+            reason_flags = [0] * n
+
+        for i in range(n):
+            sample_rows = [row for row in samples[i] if row >= 0]
+            if not sample_rows:
+                continue
+            result = _match_event(
+                [(gps_x[row], gps_y[row], gps_degree[row]) for row in sample_rows],
+                profile_index,
+                collect,
+            )
+            match = result["match"]
+            limit_speed_val: Optional[float] = None
+            if match:
+                camera_ids[i] = match.get("cam_id", "") or ""
+                limit_speed_val = match.get("speed")
+                if limit_speed_val is not None:
+                    limit_speeds[i] = limit_speed_val
+                raw_idx = match.get("row_idx")
+                row_idx_val: Optional[int] = None
+                if isinstance(raw_idx, numbers.Integral):
+                    row_idx_val = int(raw_idx)
+                else:
+                    try:
+                        row_idx_val = int(str(raw_idx).strip())
+                    except (TypeError, ValueError):
+                        row_idx_val = None
+                if row_idx_val is not None:
+                    row_idx_values[i] = row_idx_val
+                    row_idx_missing[i] = False
+
+            classification = classify_speed(
+                limit_speed_val, _speed(samples[i, 0]), _speed(samples[i, 1]), _speed(samples[i, 2])
+            )
+            if classification is not None:
+                classes[i] = classification
+                classes_missing[i] = False
+
+            if collect:
+                stats = result["stats"]
+                if stats:
+                    candidates[i] = stats["in_radius"]
+                    heading_rejected[i] = stats["heading_rejected"]
+                    azimuth_rejected[i] = stats["azimuth_rejected"]
                 if match:
-                    camera_id_val = match.get("cam_id", "") or ""
-                    limit_speed_val = match.get("speed")
-                    raw_idx = match.get("row_idx")
-                    if isinstance(raw_idx, numbers.Integral):
-                        row_idx_val = int(raw_idx)
-                    else:
-                        try:
-                            row_idx_val = int(str(raw_idx).strip())
-                        except (TypeError, ValueError):
-                            row_idx_val = None
-                    break
-
-        classification = classify_speed(limit_speed_val, t0, p5, p10)
-
-        recs.append({
-            "_source_file": src,
-            "Num_event": num_event,
-            "DateTime": DateTime,
-            "eventcode": eventcode,
-            "GPS_X": GPS_X,
-            "GPS_Y": GPS_Y,
-            "GPS_Degree": GPS_Degree,
-            "camera_id": camera_id_val,
-            "row_idx": row_idx_val if row_idx_val is not None else pd.NA,
-            "과속속도": limit_speed_val if limit_speed_val is not None else pd.NA,
-            "t0": t0,
-            "t+5s": p5,
-            "t+10s": p10,
-            "t0_과속속도_분류": classification,
-            "_month": month_val,
-        })
-
-    out = pd.DataFrame.from_records(recs)
-
-    cols = [
-        "Num_event", "DateTime", "eventcode",
-        "GPS_X", "GPS_Y", "GPS_Degree", "camera_id", "row_idx",
-        "과속속도", "t0", "t+5s", "t+10s", "t0_과속속도_분류", "_month", "_source_file",
-    ]
-    for c in cols:
-        if c not in out.columns:
-            out[c] = pd.NA
-    out = out[cols]
-
-    return out
+                    matched_pos[i] = result["pos"]
+                    match_modes[i] = 1 if result["mode"] == "strict" else 2
+                    distances[i] = match["distance"]
+                invalid_gps[i] = result["invalid_gps"]
+                reason_flags[i] = _diagnostic_reason(profile_index is not None, result)
+
+        if collect:
+            has_samples = samples[:, 0] >= 0
+            matched_pos = np.asarray(matched_pos, dtype=np.intp)
+            match_modes = np.asarray(match_modes, dtype=np.intp)
+            matched_rows = np.where(matched_pos >= 0, samples[np.arange(n), matched_pos], -1)[has_samples]
+            diagnostics.add_frame(pd.DataFrame({
+                "_source_file": source_files[has_samples],
+                "Num_event": out_cols["Num_event"][has_samples],
+                "profile": profile.name,
+                "sample_count": (samples >= 0).sum(axis=1)[has_samples],
+                "matched_sample": np.array(SAMPLE_LABELS + ("",), dtype=object)[matched_pos[has_samples]],
+                "input_csv": _input_csv_labels(df, matched_rows, diagnostics.input_csv),
+                "source_row": _index_labels(df.index, matched_rows),
+                "match_mode": np.array(MATCH_MODES, dtype=object)[match_modes[has_samples]],
+                "camera_id": camera_ids[has_samples],
+                "distance_m": np.asarray(distances, dtype=float)[has_samples],
+                "candidates": np.asarray(candidates, dtype=np.int64)[has_samples],
+                "heading_rejected": np.asarray(heading_rejected, dtype=np.int64)[has_samples],
+                "azimuth_rejected": np.asarray(azimuth_rejected, dtype=np.int64)[has_samples],
+                "invalid_gps": np.asarray(invalid_gps, dtype=np.int64)[has_samples],
+                "reason": _reason_labels(np.asarray(reason_flags, dtype=np.int64)[has_samples]),
+            }, copy=False))
+
+        out_cols[_profile_column("camera_id", profile, suffixed)] = camera_ids
+        out_cols[_profile_column("row_idx", profile, suffixed)] = pd.arrays.IntegerArray(row_idx_values, row_idx_missing)
+        out_cols[_profile_column("과속속도", profile, suffixed)] = limit_speeds
+        classification_cols[_profile_column("t0_과속속도_분류", profile, suffixed)] = pd.arrays.IntegerArray(
+            classes, classes_missing
+        )
 
+    out_cols["t0"] = speed_array.take(first)
+    out_cols["t+5s"] = speed_array.take(samples_all[:, 1], allow_fill=True)
+    out_cols["t+10s"] = speed_array.take(samples_all[:, 2], allow_fill=True)
+    out_cols.update(classification_cols)
 
-def write_by_month(out_df: pd.DataFrame, xlsx_path: str):
-    out_df_sorted = out_df.sort_values(by=["_source_file", "Num_event"]).copy()
+    digits = df["_digits"].to_numpy()
+    months = np.zeros(n, dtype=np.int64)
+    months_missing = np.ones(n, dtype=bool)
+    for i in range(n):
+        month = month_from_digits(digits[first[i]])
+        if month is not None:
+            months[i] = month
+            months_missing[i] = False
+    out_cols["_month"] = pd.arrays.IntegerArray(months, months_missing)
+    out_cols["_source_file"] = source_files
+
+    return pd.DataFrame(out_cols, copy=False)
+
+
+SHEET_ORDER = ["6-7월", "8-9월", "기타"]
 
-    def _group_name(month_value: Any) -> str:
-        if isinstance(month_value, numbers.Integral):
-            month = int(month_value)
-            if month in (6, 7):
-                return "6-7월"
-            if month in (8, 9):
-                return "8-9월"
-        return "기타"
 
-    group_labels = out_df_sorted["_month"].apply(_group_name)
-    sheet_order = ["6-7월", "8-9월", "기타"]
+def _sheet_labels(months: pd.Series) -> pd.Categorical:
+    labels = np.select(
+        [months.isin([6, 7]).to_numpy(dtype=bool), months.isin([8, 9]).to_numpy(dtype=bool)],
+        ["6-7월", "8-9월"],
+        default="기타",
+    )
+    return pd.Categorical(labels, categories=SHEET_ORDER)
+
+
+def write_by_month(out_df: pd.DataFrame, xlsx_path: str):
+    out_df_sorted = out_df.sort_values(by=["_source_file", "Num_event"])
+    group_labels = _sheet_labels(out_df_sorted["_month"])
+    columns = [c for c in out_df_sorted.columns if c != "_month"]
 
     with pd.ExcelWriter(xlsx_path, engine="openpyxl") as writer:
-        for sheet in sheet_order:
-            sheet_df = out_df_sorted[group_labels == sheet]
-            if sheet_df.empty:
-                continue
-            sheet_df = sheet_df.drop(columns=["_month"], errors="ignore")
-            sheet_df.to_excel(writer, sheet_name=sheet, index=False)
+        # One pass over the categorical labels; empty sheets are skipped.
+        for sheet, sheet_df in out_df_sorted.groupby(group_labels, observed=True, sort=True):
+            sheet_df.to_excel(writer, sheet_name=str(sheet), columns=columns, index=False)
 
 
 def build_output_path(input_csv: str, output_dir: str) -> str:
@@ -703,13 +1267,72 @@ def build_output_path(input_csv: str, output_dir: str) -> str:
     return os.path.join(output_dir, f"{stem}_output.xlsx")
 
 
-def convert(input_csv: str, output_dir: str, camera_index: Optional[CameraIndex]) -> str:
+def build_diagnostics_path(xlsx_path: str, diagnostics_format: str) -> str:
+    stem = os.path.splitext(xlsx_path)[0]
+    return f"{stem}_diagnostics.{diagnostics_format}"
+
+
+def convert(
+    input_csv: str,
+    output_dir: str,
+    camera_index: Optional[CameraIndex] = None,
+    diagnostics_format: Optional[str] = None,
+    *,
+    profiles: Optional[List[Tuple[MatchingProfile, Optional[CameraIndex]]]] = None,
+) -> str:
     if not os.path.isdir(output_dir):
         os.makedirs(output_dir, exist_ok=True)
     df = read_csv_smart(input_csv)
-    out_df = aggregate(df, camera_index)
+    diagnostics = MatchDiagnostics(os.path.basename(input_csv)) if diagnostics_format else None
+    out_df = aggregate(df, camera_index, diagnostics, profiles=profiles)
     out_path = build_output_path(input_csv, output_dir)
     write_by_month(out_df, out_path)
+    if diagnostics is not None:
+        write_diagnostics(diagnostics, build_diagnostics_path(out_path, diagnostics_format))
+    return out_path
+
+
+SAMPLE_COLUMNS = [
+    "_source_file", "Num_event", "DateTime", "eventcode", "GPS_X", "GPS_Y", "GPS_Degree",
+    "eventcode_int", "_digits", "Speed_num",
+]
+
+
+def build_merged_output_path(input_dir: str, output_dir: str) -> str:
+    name = os.path.basename(os.path.normpath(input_dir))
+    return os.path.join(output_dir, f"{name}_merged_output.xlsx")
+
+
+def convert_merged(
+    input_csvs: List[str],
+    out_path: str,
+    camera_index: Optional[CameraIndex] = None,
+    diagnostics_format: Optional[str] = None,
+    *,
+    profiles: Optional[List[Tuple[MatchingProfile, Optional[CameraIndex]]]] = None,
+) -> str:
+    # A (_source_file, Num_event) key may span several CSVs (e.g. export
+    # chunks). Only the rows aggregate() can still use are carried from file
+    # to file, and the single aggregation pass runs after the last file.
+    # _input_csv keeps each row's file so diagnostics can locate source_row.
+    output_dir = os.path.dirname(out_path)
+    if output_dir and not os.path.isdir(output_dir):
+        os.makedirs(output_dir, exist_ok=True)
+    profiles = _resolve_profiles(camera_index, profiles)
+    carried: Optional[pd.DataFrame] = None
+    for input_csv in input_csvs:
+        df = read_csv_smart(input_csv)[SAMPLE_COLUMNS]
+        df = df.iloc[_sample_rows(df, profiles)].assign(_input_csv=os.path.basename(input_csv))
+        if carried is not None:
+            df = pd.concat([carried, df])
+            df = df.iloc[_sample_rows(df, profiles)]
+        carried = df
+        del df
+    diagnostics = MatchDiagnostics() if diagnostics_format else None
+    out_df = aggregate(carried, diagnostics=diagnostics, profiles=profiles)
+    write_by_month(out_df, out_path)
+    if diagnostics is not None:
+        write_diagnostics(diagnostics, build_diagnostics_path(out_path, diagnostics_format))
     return out_path
 
 
@@ -722,12 +1345,29 @@ def main():
     ap.add_argument("--cam-csv", help="카메라 정보 CSV 경로 (cam_id, speed, 좌표 포함)")
     ap.add_argument("--cam-table", default=DEFAULT_CAM_TABLE, help="SQLite에서 사용할 테이블명")
     ap.add_argument("--spatialite", help="SpatiaLite 확장 모듈 경로 (DLL/SO)")
+    ap.add_argument("--merge", action="store_true", help="--input-dir의 모든 CSV를 하나의 Excel 파일로 병합 출력")
+    ap.add_argument(
+        "--diagnostics",
+        choices=("csv", "parquet"),
+        help="이벤트별 카메라 매칭 진단 정보를 별도 파일(<출력>_diagnostics.csv/.parquet)로 저장",
+    )
+    ap.add_argument(
+        "--profile",
+        action="append",
+        default=[],
+        help="매칭 프로필 (예: r500:radius=500,heading=15). 여러 번 지정 가능",
+    )
+    ap.add_argument("--profiles-file", help="매칭 프로필 JSON 파일 경로")
     args = ap.parse_args()
     try:
         if args.input and args.input_dir:
             raise ValueError('하나의 입력 방식만 선택하세요 (--input 또는 --input-dir).')
         if not args.input and not args.input_dir:
             raise ValueError('CSV 파일 또는 디렉터리 중 하나를 지정해야 합니다.')
+        if args.merge and not args.input_dir:
+            raise ValueError('--merge는 --input-dir과 함께 사용해야 합니다.')
+        if args.diagnostics == "parquet" and not _has_parquet_engine():
+            raise RuntimeError('--diagnostics parquet에는 pyarrow 또는 fastparquet 설치가 필요합니다.')
 
         input_paths: List[Path]
         output_dir_root: Path
@@ -746,17 +1386,33 @@ def main():
             input_paths = [file_path]
             output_dir_root = Path(args.output_dir)
 
-        camera_index, auto_message = build_camera_index(args.cam_db, args.cam_csv, args.cam_table, args.spatialite)
+        profiles: List[MatchingProfile] = []
+        if args.profiles_file:
+            profiles.extend(load_matching_profiles(args.profiles_file))
+        profiles.extend(parse_profile_spec(spec) for spec in args.profile)
+        if not profiles:
+            profiles.append(default_matching_profile())
+
+        profile_indexes, auto_message = build_profile_indexes(
+            args.cam_db, args.cam_csv, args.cam_table, args.spatialite, profiles
+        )
         if auto_message:
             print(auto_message)
 
-        if args.input_dir:
+        if args.input_dir and args.merge:
+            output_dir_root.mkdir(parents=True, exist_ok=True)
+            merged_path = build_merged_output_path(args.input_dir, str(output_dir_root))
+            out = convert_merged(
+                [str(p) for p in input_paths], merged_path, diagnostics_format=args.diagnostics, profiles=profile_indexes
+            )
+            print(f'[완료] {len(input_paths)}개 파일 병합 -> {out}')
+        elif args.input_dir:
             output_dir_root.mkdir(parents=True, exist_ok=True)
             for csv_path in input_paths:
-                out = convert(str(csv_path), str(output_dir_root), camera_index)
+                out = convert(str(csv_path), str(output_dir_root), diagnostics_format=args.diagnostics, profiles=profile_indexes)
                 print(f'[완료] {csv_path.name} -> {out}')
         else:
-            out = convert(str(input_paths[0]), str(output_dir_root), camera_index)
+            out = convert(str(input_paths[0]), str(output_dir_root), diagnostics_format=args.diagnostics, profiles=profile_indexes)
             print(f'[완료] 저장: {out}')
     except Exception as e:
         print(f'[실패] {e}', file=sys.stderr)
@@ -0,0 +1,7 @@
+import sys
+from pathlib import Path
+
+# The converter is a single script at the repository root; tests/ holds the
+# shared synthetic-input helpers.
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
@@ -0,0 +1,65 @@
+"""Synthetic inputs shared by the tests."""
+
+from typing import Any, Dict, List
+
+import numpy as np
+import pandas as pd
+
+import csv_to_excel_events as cte
+
+
+def synthetic_events(n_rows: int, seed: int = 0) -> pd.DataFrame:
+    """A frame shaped like read_csv_smart() output, about four rows per event."""
+    rng = np.random.default_rng(seed)
+    months = rng.integers(1, 13, n_rows)
+    date_time = np.char.add(
+        np.char.add("25", np.char.zfill(months.astype(str), 2)),
+        rng.integers(10**7, 10**8, n_rows).astype(str),
+    )
+    gps_x = 127.0 + rng.random(n_rows) * 0.2
+    gps_x[rng.random(n_rows) < 0.03] = np.nan
+    gps_degree = rng.random(n_rows) * 360.0
+    gps_degree[rng.random(n_rows) < 0.03] = np.nan
+    df = pd.DataFrame({
+        "Num_event": rng.integers(0, max(n_rows // 4, 1), n_rows),
+        "DateTime": date_time,
+        "eventcode": rng.choice([81, 82, 83, 84, 85, 90], n_rows),
+        "Speed": rng.integers(40, 130, n_rows),
+        "GPS_X": gps_x,
+        "GPS_Y": 37.0 + rng.random(n_rows) * 0.2,
+        "GPS_Degree": gps_degree,
+        "_source_file": rng.choice(["a.csv", "b.csv"], n_rows),
+    })
+    df["eventcode_int"] = pd.to_numeric(df["eventcode"], errors="coerce").astype("Int64")
+    df["_digits"] = df["DateTime"].astype(str).str.replace(r"\D", "", regex=True)
+    df["Speed_num"] = pd.to_numeric(df["Speed"], errors="coerce")
+    return df
+
+
+def synthetic_camera_records(n_cameras: int, seed: int = 1) -> List[Dict[str, Any]]:
+    rng = np.random.default_rng(seed)
+    return [
+        {
+            "row_idx": i,
+            "cam_id": f"C{i}",
+            "speed": float(rng.choice([50, 60, 80])),
+            "longitude": 127.0 + rng.random() * 0.2,
+            "latitude": 37.0 + rng.random() * 0.2,
+            "type": "EP",
+            "heading": rng.random() * 360.0,
+            "code": "1-0",
+        }
+        for i in range(n_cameras)
+    ]
+
+
+def synthetic_cameras(n_cameras: int, seed: int = 1) -> cte.CameraIndex:
+    return cte.CameraIndex(synthetic_camera_records(n_cameras, seed))
+
+
+RAW_COLUMNS = ["Num_event", "DateTime", "eventcode", "Speed", "GPS_X", "GPS_Y", "GPS_Degree", "_source_file"]
+
+
+def write_event_csv(df: pd.DataFrame, path) -> None:
+    """Write the raw columns of a synthetic frame as an input CSV for read_csv_smart()."""
+    df[RAW_COLUMNS].to_csv(path, index=False)
@@ -0,0 +1,106 @@
+import tracemalloc
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+import csv_to_excel_events as cte
+from synthetic import synthetic_cameras, synthetic_events
+
+
+def _reference_aggregate(df: pd.DataFrame, camera_index: Optional[cte.CameraIndex]) -> pd.DataFrame:
+    """The straightforward per-group implementation aggregate() replaced."""
+    df_f = df[df["eventcode_int"].isin(list(cte.ALLOW_EVENTCODES))]
+    recs = []
+    for (src, num_event), g in df_f.groupby(["_source_file", "Num_event"], sort=False):
+        g3 = g.sort_values("_digits", kind="stable").head(3)
+        speeds = g3["Speed_num"].tolist() + [None, None]
+        row0 = g3.iloc[0]
+        camera_id, row_idx, limit = "", pd.NA, pd.NA
+        if camera_index is not None:
+            for pos in [p for p in (1, 0, 2) if p < len(g3)]:
+                row = g3.iloc[pos]
+                lon = cte._safe_float(row["GPS_X"])
+                lat = cte._safe_float(row["GPS_Y"])
+                heading = cte._safe_float(row["GPS_Degree"])
+                if lon is None or lat is None:
+                    continue
+                match = None
+                if heading is not None:
+                    match = camera_index.lookup(lon, lat, heading, require_heading=True)
+                if match is None:
+                    match = camera_index.lookup(lon, lat, heading, require_heading=False)
+                if match:
+                    camera_id, row_idx, limit = match["cam_id"], match["row_idx"], match["speed"]
+                    break
+        recs.append({
+            "Num_event": num_event,
+            "DateTime": row0["DateTime"],
+            "eventcode": row0["eventcode"],
+            "GPS_X": row0["GPS_X"],
+            "GPS_Y": row0["GPS_Y"],
+            "GPS_Degree": row0["GPS_Degree"],
+            "camera_id": camera_id,
+            "row_idx": row_idx,
+            "과속속도": limit,
+            "t0": speeds[0],
+            "t+5s": speeds[1],
+            "t+10s": speeds[2],
+            "t0_과속속도_분류": cte.classify_speed(
+                None if limit is pd.NA else limit, speeds[0], speeds[1], speeds[2]
+            ),
+            "_month": cte.month_from_digits(row0["_digits"]),
+            "_source_file": src,
+        })
+    return pd.DataFrame.from_records(recs)
+
+
+def _as_float(series: pd.Series) -> np.ndarray:
+    return pd.to_numeric(series.astype(object).where(series.notna(), np.nan)).to_numpy(dtype=float)
+
+
+def test_aggregate_peak_memory_is_bounded_by_input_size():
+    df = synthetic_events(200_000)
+    input_bytes = int(df.memory_usage(deep=True).sum())
+
+    tracemalloc.start()
+    try:
+        out = cte.aggregate(df, None)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    assert len(out) == df.loc[df["eventcode"] != 90, ["_source_file", "Num_event"]].drop_duplicates().shape[0]
+    # The per-group implementation peaked at about 2.2x the input size;
+    # the positional one stays near 0.4x.
+    assert peak < 0.5 * input_bytes, f"peak {peak} bytes for {input_bytes} bytes of input"
+
+
+def test_aggregate_and_write_by_month_match_reference(tmp_path):
+    df = synthetic_events(8_000, seed=2)
+    camera_index = synthetic_cameras(300)
+
+    out = cte.aggregate(df, camera_index)
+    expected = _reference_aggregate(df, camera_index)
+
+    assert list(out.columns) == list(expected.columns)
+    assert len(out) == len(expected)
+    for col in ("row_idx", "과속속도", "t0", "t+5s", "t+10s", "t0_과속속도_분류", "_month"):
+        np.testing.assert_array_equal(_as_float(out[col]), _as_float(expected[col]), err_msg=col)
+    for col in ("Num_event", "DateTime", "eventcode", "GPS_X", "GPS_Y", "GPS_Degree", "camera_id", "_source_file"):
+        pd.testing.assert_series_equal(out[col], expected[col], check_dtype=False)
+    assert (out["camera_id"] != "").any()
+
+    cte.write_by_month(out, str(tmp_path / "out.xlsx"))
+    sheets = pd.read_excel(tmp_path / "out.xlsx", sheet_name=None)
+    assert list(sheets) == cte.SHEET_ORDER
+    labels = np.where(
+        expected["_month"].isin([6, 7]), "6-7월", np.where(expected["_month"].isin([8, 9]), "8-9월", "기타")
+    )
+    ordered = expected.assign(_sheet=labels).sort_values(["_source_file", "Num_event"])
+    for sheet, sheet_df in sheets.items():
+        want = ordered[ordered["_sheet"] == sheet]
+        assert "_month" not in sheet_df.columns
+        assert sheet_df["Num_event"].tolist() == want["Num_event"].tolist()
+        assert sheet_df["_source_file"].tolist() == want["_source_file"].tolist()
+        assert sheet_df["camera_id"].fillna("").tolist() == want["camera_id"].tolist()
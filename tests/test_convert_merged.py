@@ -0,0 +1,33 @@
+import numpy as np
+import pandas as pd
+
+import csv_to_excel_events as cte
+from synthetic import synthetic_cameras, synthetic_events, write_event_csv
+
+
+def test_split_source_gives_same_workbook_as_unsplit_file(tmp_path):
+    df = synthetic_events(6_000, seed=3)
+    camera_index = synthetic_cameras(300)
+
+    whole_csv = tmp_path / "whole.csv"
+    write_event_csv(df, whole_csv)
+    whole_xlsx = cte.convert(str(whole_csv), str(tmp_path / "whole_out"), camera_index)
+
+    # Scatter rows over three files so most events span several of them.
+    part_of_row = np.random.default_rng(4).integers(0, 3, len(df))
+    part_csvs = []
+    for part in range(3):
+        path = tmp_path / "parts" / f"part{part}.csv"
+        path.parent.mkdir(exist_ok=True)
+        write_event_csv(df[part_of_row == part], path)
+        part_csvs.append(str(path))
+    keys = df.assign(_part=part_of_row).groupby(["_source_file", "Num_event"])["_part"].nunique()
+    assert (keys > 1).sum() > 100
+
+    merged_xlsx = cte.convert_merged(part_csvs, str(tmp_path / "merged.xlsx"), camera_index)
+
+    whole = pd.read_excel(whole_xlsx, sheet_name=None)
+    merged = pd.read_excel(merged_xlsx, sheet_name=None)
+    assert list(merged) == list(whole)
+    for sheet, sheet_df in whole.items():
+        pd.testing.assert_frame_equal(merged[sheet], sheet_df)
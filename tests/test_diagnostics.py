@@ -0,0 +1,39 @@
+import pandas as pd
+
+import csv_to_excel_events as cte
+from synthetic import RAW_COLUMNS
+
+
+def _event_rows(rows):
+    return pd.DataFrame(rows, columns=RAW_COLUMNS)
+
+
+def test_merged_diagnostics_point_at_file_and_row_of_match(tmp_path):
+    camera_index = cte.CameraIndex([{
+        "row_idx": 0, "cam_id": "C0", "speed": 60.0, "longitude": 127.0, "latitude": 37.001,
+        "type": "EP", "heading": 0.0, "code": "1-0",
+    }])
+    # Event 1 starts in a.csv (row 1) and continues in b.csv, where its t+5s
+    # record (row 0, tried first) is ~110 m south of the camera, heading north.
+    a_csv, b_csv = tmp_path / "a.csv", tmp_path / "b.csv"
+    _event_rows([
+        [2, "250701120000", 81, 70, 127.1, 37.1, 90.0, "src.csv"],
+        [1, "250701120000", 81, 80, 127.0, 36.9998, 0.0, "src.csv"],
+    ]).to_csv(a_csv, index=False)
+    _event_rows([
+        [1, "250701120005", 81, 75, 127.0, 37.0, 0.0, "src.csv"],
+        [1, "250701120010", 81, 70, 127.0, 37.0002, 0.0, "src.csv"],
+    ]).to_csv(b_csv, index=False)
+
+    out_path = cte.convert_merged(
+        [str(a_csv), str(b_csv)], str(tmp_path / "merged.xlsx"), camera_index, diagnostics_format="csv"
+    )
+
+    diagnostics = pd.read_csv(cte.build_diagnostics_path(out_path, "csv"))
+    event = diagnostics[diagnostics["Num_event"] == 1].iloc[0]
+    assert event["sample_count"] == 3
+    assert event["matched_sample"] == "t+5s"
+    assert event["match_mode"] == "strict"
+    assert event["camera_id"] == "C0"
+    assert event["input_csv"] == "b.csv"
+    assert event["source_row"] == 0
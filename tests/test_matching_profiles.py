@@ -0,0 +1,105 @@
+import json
+
+import pandas as pd
+import pytest
+
+import csv_to_excel_events as cte
+from synthetic import synthetic_camera_records, synthetic_events
+
+
+def test_profile_spec_code_lists_use_separator():
+    profile = cte.parse_profile_spec("ev:radius=500,heading=15,event_codes=81|82,camera_codes=1-0 | 7-0")
+    assert profile.name == "ev"
+    assert profile.search_radius_m == 500.0
+    assert profile.heading_tolerance_deg == 15.0
+    assert profile.event_codes == frozenset({81, 82})
+    assert profile.camera_codes == frozenset({"1-0", "7-0"})
+    assert cte.parse_profile_spec("one:event_codes=81").event_codes == frozenset({81})
+
+
+def test_profiles_file_accepts_code_lists_and_text(tmp_path):
+    path = tmp_path / "profiles.json"
+    path.write_text(json.dumps({"profiles": [
+        {"name": "list", "event_codes": [81, "82"], "camera_codes": ["1-0"]},
+        {"name": "text", "event_codes": "81|83"},
+        {"radius": 300},
+    ]}), encoding="utf-8")
+    listed, text, unnamed = cte.load_matching_profiles(str(path))
+    assert listed.event_codes == frozenset({81, 82})
+    assert listed.camera_codes == frozenset({"1-0"})
+    assert text.event_codes == frozenset({81, 83})
+    assert unnamed.name == "profile3"
+    assert unnamed.search_radius_m == 300.0
+    assert unnamed.event_codes == cte.default_matching_profile().event_codes
+
+
+@pytest.mark.parametrize("spec", [
+    "p:event_codes=",
+    "p:event_codes=|",
+    "p:camera_codes= | ",
+    "p:event_codes=81|x",
+])
+def test_profile_spec_rejects_empty_or_invalid_code_lists(spec):
+    with pytest.raises(ValueError):
+        cte.parse_profile_spec(spec)
+
+
+def test_profiles_file_rejects_empty_code_list(tmp_path):
+    path = tmp_path / "profiles.json"
+    path.write_text(json.dumps([{"name": "p", "camera_codes": []}]), encoding="utf-8")
+    with pytest.raises(ValueError):
+        cte.load_matching_profiles(str(path))
+
+
+@pytest.mark.parametrize("heading", ["-1", "181", "inf", "nan", "x"])
+def test_profile_spec_rejects_heading_out_of_range(heading):
+    with pytest.raises(ValueError):
+        cte.parse_profile_spec(f"p:heading={heading}")
+
+
+@pytest.mark.parametrize("radius", ["0", "-5", "inf", "nan"])
+def test_profile_spec_rejects_non_positive_radius(radius):
+    with pytest.raises(ValueError):
+        cte.parse_profile_spec(f"p:radius={radius}")
+
+
+def test_profile_spec_accepts_heading_bounds():
+    assert cte.parse_profile_spec("p:heading=0").heading_tolerance_deg == 0.0
+    assert cte.parse_profile_spec("p:heading=180").heading_tolerance_deg == 180.0
+
+
+def test_duplicate_profile_names_are_rejected():
+    with pytest.raises(ValueError):
+        cte._check_profile_names([cte.parse_profile_spec("p:radius=300"), cte.parse_profile_spec("p")])
+
+
+PROFILE_COLUMNS = ["camera_id", "row_idx", "과속속도", "t0_과속속도_분류"]
+
+
+def test_suffixed_profile_columns_match_single_profile_runs():
+    df = synthetic_events(8_000, seed=5)
+    records = synthetic_camera_records(300)
+    narrow = cte.parse_profile_spec("r300:radius=300,heading=10,event_codes=81|82")
+    default = cte.default_matching_profile()
+    profiles = [(profile, cte.build_profile_index(records, profile)) for profile in (narrow, default)]
+
+    both = cte.aggregate(df, profiles=profiles)
+
+    for profile, index in profiles:
+        single = cte.aggregate(df, profiles=[(profile, index)])
+        merged = both.merge(
+            single[["_source_file", "Num_event"] + PROFILE_COLUMNS],
+            on=["_source_file", "Num_event"], how="left", suffixes=("", "_single"), indicator=True,
+        )
+        in_single = (merged["_merge"] == "both").to_numpy()
+        assert in_single.sum() == len(single)
+        for column in PROFILE_COLUMNS:
+            pd.testing.assert_series_equal(
+                merged.loc[in_single, f"{column}_{profile.name}"],
+                merged.loc[in_single, column],
+                check_names=False,
+                check_dtype=False,
+            )
+        # Events with none of this profile's event codes get no camera.
+        assert (merged.loc[~in_single, f"camera_id_{profile.name}"] == "").all()
+        assert merged.loc[~in_single, f"row_idx_{profile.name}"].isna().all()